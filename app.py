@@ -1,13 +1,22 @@
 #app.py
 import streamlit as st
-from csv_analyzer import analyze_csv_bulk, validate_csv_columns, DEPUTATION_FACTORS, DEFAULT_WORKING_DAYS
+from csv_analyzer import (
+    analyze_csv_bulk, load_input_file, normalize_column_names, validate_csv_columns, is_billing_column,
+    DEPUTATION_FACTORS, DEFAULT_WORKING_DAYS, DEFAULT_EMPLOYEE_PARAMS
+)
 from tsr_processor import (
     load_tsr_file, add_tsr_to_dataframe, convert_exchange_rate,
     DEPUTATION_TO_COUNTRY, COUNTRY_TO_CURRENCY, DEFAULT_EXCHANGE_RATES
 )
 import pandas as pd
+import numpy as np
 import io
 
+# Copy-on-Write turns derived frames into views until they are modified.
+# It is always on from pandas 3.0, where setting the option is deprecated.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
 MONTHS = [
     "Jan", "Feb", "Mar", "Apr", "May", "Jun",
     "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"
@@ -15,6 +24,230 @@ MONTHS = [
 
 OFFSHORE_COUNTRIES = ["Mexico", "Philippines", "Poland", "Brazil", "Argentina", "Canada"]
 
+# Default exchange rate inputs per currency: (1 USD = X local, 1 local = X USD)
+DEFAULT_RATE_INPUTS = {
+    "INR": (82.25, 0.012),
+    "MXN": (17.2, 0.058)
+}
+FALLBACK_RATE_INPUTS = (55.5, 0.018)
+
+# st.cache_data entries are shared by every session and only evicted when these limits are hit.
+# Sized for a handful of concurrent users, each holding a few uploads and results.
+CACHE_SESSIONS = 10
+CACHE_TTL = 60 * 60  # seconds
+
+
+def as_uploaded_file(data, name):
+    """Wrap raw upload bytes in a file-like object with a name, like Streamlit's UploadedFile"""
+    buffer = io.BytesIO(data)
+    buffer.name = name
+    return buffer
+
+
+@st.cache_data(show_spinner=False, max_entries=3 * CACHE_SESSIONS, ttl=CACHE_TTL)
+def load_cached_input(file_bytes, name, nrows=None, billing_columns=False):
+    """Parse an uploaded file once per content; nrows=0 reads only the header, billing_columns skips unused columns"""
+    usecols = is_billing_column if billing_columns else None
+    return load_input_file(as_uploaded_file(file_bytes, name), nrows=nrows, usecols=usecols)
+
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_SESSIONS, ttl=CACHE_TTL)
+def resource_list(file_bytes, name):
+    """Unique, non-empty resource names of the main upload"""
+    df = normalize_column_names(load_cached_input(file_bytes, name, billing_columns=True))
+    resources = df['Resource'].to_numpy()
+    return pd.unique(resources[pd.notna(resources)]).tolist()
+
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_SESSIONS, ttl=CACHE_TTL)
+def to_csv_bytes(df):
+    """Serialize a DataFrame to UTF-8 CSV bytes"""
+    output = io.BytesIO()
+    df.to_csv(output, index=False, encoding='utf-8')
+    return output.getvalue()
+
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_SESSIONS, ttl=CACHE_TTL)
+def to_excel_bytes(df):
+    """Serialize a DataFrame to an .xlsx workbook"""
+    output = io.BytesIO()
+    # xlsxwriter is considerably faster than openpyxl for write-only workbooks.
+    # constant_memory is not used: pandas writes cells column by column, which that mode drops.
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name='Billing Analysis')
+    return output.getvalue()
+
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_SESSIONS, ttl=CACHE_TTL)
+def run_pipeline(main_df, update_df, tsr_bytes, tsr_name, employee_params, working_days_config, tsr_config):
+    """
+    Run billing analysis (and TSR enrichment when a TSR file is given).
+
+    Cached on the parsed input data, TSR file bytes and configuration so
+    Streamlit reruns with unchanged inputs skip reprocessing.
+
+    Returns:
+        tuple: (result_df, tsr_error) where tsr_error is "" on success
+    """
+    # Step 1: Process main billing data
+    result_df = analyze_csv_bulk(
+        main_df,
+        employee_params,
+        working_days_config=working_days_config,
+        aug_csv=update_df
+    )
+
+    # Step 2: Add TSR data if TSR file provided
+    tsr_error = ""
+    if tsr_bytes is not None:
+        try:
+            tsr_df = load_tsr_file(as_uploaded_file(tsr_bytes, tsr_name))
+            result_df = add_tsr_to_dataframe(
+                result_df,
+                tsr_df,
+                tsr_config["offshore_country"],
+                tsr_config["exchange_rates"],
+                MONTHS
+            )
+        except Exception as e:
+            tsr_error = str(e)
+
+    return result_df, tsr_error
+
+
+def render_employee(emp):
+    """
+    Render the adjustment widgets for one employee and return its parameters.
+
+    Returns None when the fields of the selected adjustment type are shown for the first time.
+    """
+    st.markdown(f"### {emp}")
+
+    leave_type = st.selectbox(
+        f"Adjustment type",
+        ["No adjustment", "Employee left", "Leave days"],
+        key=f"type_{emp}"
+    )
+
+    # Form widgets only rerun on submit, so a newly picked type's fields first appear on the run that
+    # saves it - with default values the user hasn't seen. Those are not returned as parameters.
+    shown_key = f"shown_type_{emp}"
+    fields_seen = leave_type == "No adjustment" or st.session_state.get(shown_key) == leave_type
+    st.session_state[shown_key] = leave_type
+
+    if leave_type == "Employee left":
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            left_year = st.number_input(
+                "Exit year",
+                min_value=2020,
+                max_value=2030,
+                value=2025,
+                key=f"left_year_{emp}"
+            )
+        with col2:
+            left_month = st.selectbox(
+                f"Exit month",
+                MONTHS,
+                key=f"left_month_{emp}"
+            )
+        with col3:
+            left_day = st.number_input(
+                f"Exit day",
+                min_value=1,
+                max_value=31,
+                value=15,
+                key=f"left_day_{emp}"
+            )
+
+        params = {
+            **DEFAULT_EMPLOYEE_PARAMS,
+            "employee_left": True,
+            "left_in_month": left_month,
+            "left_day": left_day,
+            "left_year": str(left_year)
+        }
+
+        add_replacement = st.checkbox(
+            "Add replacement employee",
+            key=f"replacement_{emp}"
+        )
+
+        if add_replacement:
+            st.markdown(f"#### Replacement for {emp}")
+
+            col1, col2 = st.columns(2)
+            with col1:
+                replacement_name = st.text_input(
+                    "Replacement employee name",
+                    key=f"rep_name_{emp}"
+                )
+                replacement_id = st.text_input(
+                    "Replacement employee ID",
+                    key=f"rep_id_{emp}"
+                )
+
+            with col2:
+                join_year = st.number_input(
+                    "Join year",
+                    min_value=2020,
+                    max_value=2030,
+                    value=2025,
+                    key=f"join_year_{emp}"
+                )
+                join_month = st.selectbox(
+                    "Join month",
+                    MONTHS,
+                    key=f"join_month_{emp}"
+                )
+
+            join_day = st.number_input(
+                "Join day",
+                min_value=1,
+                max_value=31,
+                value=1,
+                key=f"join_day_{emp}"
+            )
+
+            if replacement_name and replacement_id:
+                params["replacement_info"] = {
+                    "replacement": True,
+                    "replacement_name": replacement_name,
+                    "replacement_id": replacement_id,
+                    "join_month": join_month,
+                    "join_day": join_day,
+                    "join_year": str(join_year)
+                }
+
+    elif leave_type == "Leave days":
+        col1, col2 = st.columns(2)
+        with col1:
+            leave_month = st.selectbox(
+                f"Leave month",
+                MONTHS,
+                key=f"leave_month_{emp}"
+            )
+        with col2:
+            leave_days = st.number_input(
+                f"Leave days",
+                min_value=0,
+                max_value=30,
+                value=0,
+                key=f"leave_days_{emp}"
+            )
+
+        params = {
+            **DEFAULT_EMPLOYEE_PARAMS,
+            "leave_month": leave_month,
+            "leave_days": leave_days
+        }
+    else:
+        params = dict(DEFAULT_EMPLOYEE_PARAMS)
+
+    st.markdown("---")
+
+    return params if fields_seen else None
+
 
 def main():
     # Clean header
@@ -67,8 +300,12 @@ def main():
             )
             tsr_config["conversion_method"] = "divide" if "Divide" in conversion_method else "multiply"
 
-        # Get currency for selected offshore country
+        # Get currency and default rate inputs for selected offshore country
         offshore_currency = COUNTRY_TO_CURRENCY.get(offshore_country, "MXN")
+        inr_divide_default, inr_multiply_default = DEFAULT_RATE_INPUTS["INR"]
+        offshore_divide_default, offshore_multiply_default = DEFAULT_RATE_INPUTS.get(
+            offshore_currency, FALLBACK_RATE_INPUTS
+        )
 
         st.write("Exchange Rates Configuration")
         col1, col2, col3 = st.columns(3)
@@ -80,7 +317,7 @@ def main():
                 inr_rate = st.number_input(
                     "1 USD = ? INR",
                     min_value=0.0001,
-                    value=82.25,
+                    value=inr_divide_default,
                     step=0.01,
                     format="%.4f"
                 )
@@ -89,7 +326,7 @@ def main():
                 inr_rate = st.number_input(
                     "1 INR = ? USD",
                     min_value=0.0001,
-                    value=0.012,
+                    value=inr_multiply_default,
                     step=0.0001,
                     format="%.4f"
                 )
@@ -100,7 +337,7 @@ def main():
                 offshore_rate = st.number_input(
                     f"1 USD = ? {offshore_currency}",
                     min_value=0.0001,
-                    value=17.2 if offshore_currency == "MXN" else 55.5,
+                    value=offshore_divide_default,
                     step=0.01,
                     format="%.4f"
                 )
@@ -109,7 +346,7 @@ def main():
                 offshore_rate = st.number_input(
                     f"1 {offshore_currency} = ? USD",
                     min_value=0.0001,
-                    value=0.058 if offshore_currency == "MXN" else 0.018,
+                    value=offshore_multiply_default,
                     step=0.0001,
                     format="%.4f"
                 )
@@ -134,46 +371,36 @@ def main():
 
     if use_default_days == "Use 21 days for all months":
         for month in MONTHS:
-            working_days_config[month] = 21
+            working_days_config[month] = DEFAULT_WORKING_DAYS
     else:
         st.write("Set working days for each month:")
-        cols = st.columns(4)
-        for idx, month in enumerate(MONTHS):
-            with cols[idx % 4]:
-                working_days_config[month] = st.number_input(
-                    month,
-                    min_value=1,
-                    max_value=31,
-                    value=21,
-                    key=f"days_{month}"
-                )
+        # One editable table instead of 12 separate number inputs
+        edited_days = st.data_editor(
+            pd.DataFrame({"Month": MONTHS, "Days": [DEFAULT_WORKING_DAYS] * len(MONTHS)}),
+            num_rows="fixed",
+            disabled=["Month"],
+            hide_index=True,
+            column_config={
+                "Days": st.column_config.NumberColumn(min_value=1, max_value=31, step=1, required=True)
+            },
+            key="working_days_editor"
+        )
+        for month, days in zip(edited_days["Month"], edited_days["Days"]):
+            working_days_config[month] = int(days) if pd.notna(days) else DEFAULT_WORKING_DAYS
 
     if uploaded_file is not None:
         try:
-            # Read and validate file
-            uploaded_file.seek(0)
-            if uploaded_file.name.endswith('.xlsx'):
-                df = pd.read_excel(uploaded_file)
-            else:
-                df = pd.read_csv(io.StringIO(uploaded_file.getvalue().decode("utf-8")))
+            file_bytes = uploaded_file.getvalue()
 
-            df.columns = df.columns.str.strip()
-
-            # Normalize column names
-            column_mapping = {
-                "NAME": "Resource", "Name": "Resource", "name": "Resource",
-                "NEW_EMP_ID": "Hexaware ID's", "Employee ID": "Hexaware ID's",
-                "Rate": "Average/Flat-lined Rate", "RATE": "Average/Flat-lined Rate",
-                "DEPUTATION": "Deputation", "deputation": "Deputation",
-                "Proj Desc": "Project", "PROJECT": "Project",
-                "STATUS": "Empl Status", "Status": "Empl Status"
-            }
-            df = df.rename(columns=column_mapping)
-
-            validate_csv_columns(df, "Main CSV")
+            # Validate using the header row only
+            header_df = normalize_column_names(load_cached_input(file_bytes, uploaded_file.name, nrows=0))
+            validate_csv_columns(header_df, "Main CSV")
 
             st.success("Main CSV validated successfully")
-            resource_options = df['Resource'].dropna().unique().tolist()
+
+            # Full parse is cached per file content and reused for processing
+            df = normalize_column_names(load_cached_input(file_bytes, uploaded_file.name, billing_columns=True))
+            resource_options = resource_list(file_bytes, uploaded_file.name)
 
             # Employee adjustments section
             st.subheader("Employee Adjustments")
@@ -186,225 +413,130 @@ def main():
 
             employee_params = {}
 
-            for emp in selected_employees:
-                st.markdown(f"### {emp}")
+            if selected_employees:
+                # Widgets inside the form only rerun the script when the form is submitted
+                with st.form("emp_form"):
+                    for emp in selected_employees:
+                        employee_params[emp] = render_employee(emp)
 
-                leave_type = st.selectbox(
-                    f"Adjustment type",
-                    ["No adjustment", "Employee left", "Leave days"],
-                    key=f"type_{emp}"
-                )
+                    st.caption("After changing an adjustment type, save to show its fields, then fill them in and save again")
+                    submitted = st.form_submit_button("Save adjustments")
 
-                if leave_type == "Employee left":
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        left_year = st.number_input(
-                            "Exit year",
-                            min_value=2020,
-                            max_value=2030,
-                            value=2025,
-                            key=f"left_year_{emp}"
-                        )
-                    with col2:
-                        left_month = st.selectbox(
-                            f"Exit month",
-                            MONTHS,
-                            key=f"left_month_{emp}"
-                        )
-                    with col3:
-                        left_day = st.number_input(
-                            f"Exit day",
-                            min_value=1,
-                            max_value=31,
-                            value=15,
-                            key=f"left_day_{emp}"
-                        )
-
-                    employee_params[emp] = {
-                        "employee_left": True,
-                        "left_in_month": left_month,
-                        "left_day": left_day,
-                        "left_year": str(left_year),
-                        "leave_month": "",
-                        "leave_days": 0,
-                        "replacement_info": {}
+                if submitted:
+                    st.session_state["employee_params"] = {
+                        emp: params for emp, params in employee_params.items() if params is not None
                     }
-
-                    add_replacement = st.checkbox(
-                        "Add replacement employee",
-                        key=f"replacement_{emp}"
+                    st.session_state["unsaved_adjustments"] = [
+                        emp for emp, params in employee_params.items() if params is None
+                    ]
+
+                unsaved = [emp for emp in st.session_state.get("unsaved_adjustments", []) if emp in selected_employees]
+                if unsaved:
+                    st.warning(
+                        f"Adjustments not saved yet for: {', '.join(unsaved)}. "
+                        "Check their fields and save again, otherwise they are processed without adjustments."
                     )
 
-                    if add_replacement:
-                        st.markdown(f"#### Replacement for {emp}")
-
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            replacement_name = st.text_input(
-                                "Replacement employee name",
-                                key=f"rep_name_{emp}"
-                            )
-                            replacement_id = st.text_input(
-                                "Replacement employee ID",
-                                key=f"rep_id_{emp}"
-                            )
-
-                        with col2:
-                            join_year = st.number_input(
-                                "Join year",
-                                min_value=2020,
-                                max_value=2030,
-                                value=2025,
-                                key=f"join_year_{emp}"
-                            )
-                            join_month = st.selectbox(
-                                "Join month",
-                                MONTHS,
-                                key=f"join_month_{emp}"
-                            )
-
-                        join_day = st.number_input(
-                            "Join day",
-                            min_value=1,
-                            max_value=31,
-                            value=1,
-                            key=f"join_day_{emp}"
-                        )
-
-                        if replacement_name and replacement_id:
-                            employee_params[emp]["replacement_info"] = {
-                                "replacement": True,
-                                "replacement_name": replacement_name,
-                                "replacement_id": replacement_id,
-                                "join_month": join_month,
-                                "join_day": join_day,
-                                "join_year": str(join_year)
-                            }
-
-                elif leave_type == "Leave days":
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        leave_month = st.selectbox(
-                            f"Leave month",
-                            MONTHS,
-                            key=f"leave_month_{emp}"
-                        )
-                    with col2:
-                        leave_days = st.number_input(
-                            f"Leave days",
-                            min_value=0,
-                            max_value=30,
-                            value=0,
-                            key=f"leave_days_{emp}"
-                        )
-
-                    employee_params[emp] = {
-                        "employee_left": False,
-                        "left_in_month": "",
-                        "left_day": 0,
-                        "left_year": "",
-                        "leave_month": leave_month,
-                        "leave_days": leave_days,
-                        "replacement_info": {}
-                    }
-                else:
-                    employee_params[emp] = {
-                        "employee_left": False,
-                        "left_in_month": "",
-                        "left_day": 0,
-                        "left_year": "",
-                        "leave_month": "",
-                        "leave_days": 0,
-                        "replacement_info": {}
-                    }
-
-                st.markdown("---")
-
             # Process button
             st.markdown("---")
             if st.button("Process Data", type="primary", use_container_width=True):
                 with st.spinner("Processing files..."):
                     try:
-                        # Step 1: Process main billing data
-                        result_df = analyze_csv_bulk(
-                            uploaded_file,
+                        # Use the last saved adjustments, limited to the currently selected employees
+                        saved_params = st.session_state.get("employee_params", {})
+                        employee_params = {
+                            emp: saved_params[emp] for emp in selected_employees if emp in saved_params
+                        }
+
+                        update_df = None
+                        if uploaded_file2 is not None:
+                            update_df = load_cached_input(
+                                uploaded_file2.getvalue(), uploaded_file2.name, billing_columns=True
+                            )
+                        result_df, tsr_error = run_pipeline(
+                            df,
+                            update_df,
+                            tsr_file.getvalue() if tsr_file is not None else None,
+                            tsr_file.name if tsr_file is not None else None,
                             employee_params,
                             working_days_config,
-                            uploaded_file2
+                            tsr_config
                         )
 
-                        # Step 2: Add TSR data if TSR file provided
                         if tsr_file is not None:
-                            try:
-                                tsr_df = load_tsr_file(tsr_file)
-                                result_df = add_tsr_to_dataframe(
-                                    result_df,
-                                    tsr_df,
-                                    tsr_config["offshore_country"],
-                                    tsr_config["exchange_rates"],
-                                    MONTHS
-                                )
+                            if tsr_error:
+                                st.warning(f"TSR processing error: {tsr_error}. Continuing without TSR data.")
+                            else:
                                 st.success("TSR data processed successfully")
-                            except Exception as e:
-                                st.warning(f"TSR processing error: {str(e)}. Continuing without TSR data.")
 
                         # Format numeric columns
-                        for col in result_df.columns:
-                            if result_df[col].dtype in ['float64', 'int64']:
-                                if "Billing" in col or "TSR" in col or "DGM" in col:
-                                    result_df[col] = result_df[col].round(2)
-                                else:
-                                    result_df[col] = result_df[col].apply(
-                                        lambda x: int(x) if x == int(x) else round(x, 2))
+                        numeric_cols = result_df.select_dtypes(include=['float64', 'int64']).columns
+                        round_cols = [col for col in numeric_cols if "Billing" in col or "TSR" in col or "DGM" in col]
+                        mixed_cols = [col for col in numeric_cols if col not in round_cols]
+
+                        if round_cols:
+                            result_df[round_cols] = result_df[round_cols].round(2)
+
+                        if mixed_cols:
+                            # Whole-number columns become int, everything else is rounded to 2 decimals
+                            vals = result_df[mixed_cols].to_numpy(dtype='float64')
+                            whole = vals == np.trunc(vals)
+                            result_df[mixed_cols] = np.where(whole, vals, np.round(vals, 2))
+                            int_cols = [col for col, is_whole in zip(mixed_cols, whole.all(axis=0)) if is_whole]
+                            if int_cols:
+                                result_df[int_cols] = result_df[int_cols].astype('int64')
 
                         # Display summary metrics
                         col1, col2, col3, col4 = st.columns(4)
 
+                        sum_cols = [col for col in ("Billing Amount", "Total TSR") if col in result_df.columns]
+                        sums = result_df[sum_cols].sum(numeric_only=True)
+
                         with col1:
                             total_employees = len(result_df)
                             st.metric("Total Employees", total_employees)
 
                         with col2:
                             if "Total TSR" in result_df.columns:
-                                with_tsr = len(result_df[result_df["Total TSR"] > 0])
+                                with_tsr = int(result_df["Total TSR"].gt(0).sum())
                                 st.metric("With TSR Data", with_tsr)
                             else:
                                 st.metric("With TSR Data", "N/A")
 
                         with col3:
                             if "Total TSR" in result_df.columns:
-                                total_tsr = result_df["Total TSR"].sum()
+                                total_tsr = sums.get("Total TSR", 0.0)
                                 st.metric("Total TSR Amount", f"${total_tsr:,.2f}")
                             else:
                                 st.metric("Total TSR Amount", "N/A")
 
                         with col4:
-                            total_billing = result_df["Billing Amount"].sum()
+                            total_billing = sums.get("Billing Amount", 0.0)
                             st.metric("Total Billing", f"${total_billing:,.2f}")
 
                         # Add working days to column headers
-                        display_df = result_df.copy()
-                        new_columns = {}
-                        for col in display_df.columns:
-                            for month in MONTHS:
-                                if f"{month} Planned" == col:
-                                    days = working_days_config.get(month, 21)
-                                    new_columns[col] = f"{col} ({days}d)"
-
-                        if new_columns:
-                            display_df = display_df.rename(columns=new_columns)
-
-                        # Highlight function
-                        def highlight_updates(row):
-                            if row.get('Updated From CSV2') == 'Yes':
-                                return ['background-color: #e6f3ff'] * len(row)
-                            elif row.get('Empl Status') == 'Inactive':
-                                return ['background-color: #ffe6e6'] * len(row)
-                            else:
-                                return [''] * len(row)
+                        existing_columns = set(result_df.columns)
+                        new_columns = {
+                            f"{month} Planned": f"{month} Planned ({working_days_config.get(month, DEFAULT_WORKING_DAYS)}d)"
+                            for month in MONTHS
+                            if f"{month} Planned" in existing_columns
+                        }
+
+                        # Renaming shares the underlying data with result_df (copy-on-write), no full copy needed
+                        display_df = result_df.rename(columns=new_columns) if new_columns else result_df
+
+                        # Highlight function (builds the whole style matrix at once)
+                        def highlight_updates(frame):
+                            styles = pd.DataFrame('', index=frame.index, columns=frame.columns)
+                            empty = pd.Series('', index=frame.index)
+                            blue = frame.get('Updated From CSV2', empty).eq('Yes')
+                            red = frame.get('Empl Status', empty).eq('Inactive') & ~blue
+                            styles.loc[blue, :] = 'background-color: #e6f3ff'
+                            styles.loc[red, :] = 'background-color: #ffe6e6'
+                            return styles
 
                         st.dataframe(
-                            display_df.style.apply(highlight_updates, axis=1),
+                            display_df.style.apply(highlight_updates, axis=None),
                             use_container_width=True,
                             height=600
                         )
@@ -416,27 +548,24 @@ def main():
 
                         col1, col2 = st.columns(2)
 
+                        # Files are only serialized when a button is clicked, and cached per result
                         with col1:
-                            csv_data = result_df.to_csv(index=False).encode('utf-8')
                             st.download_button(
                                 "Download as CSV",
-                                csv_data,
+                                lambda: to_csv_bytes(result_df),
                                 "processed_output.csv",
                                 "text/csv",
+                                on_click="ignore",
                                 use_container_width=True
                             )
 
                         with col2:
-                            output = io.BytesIO()
-                            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                                result_df.to_excel(writer, index=False, sheet_name='Billing Analysis')
-                            excel_data = output.getvalue()
-
                             st.download_button(
                                 "Download as Excel",
-                                excel_data,
+                                lambda: to_excel_bytes(result_df),
                                 "processed_output.xlsx",
                                 "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                on_click="ignore",
                                 use_container_width=True
                             )
 
@@ -1,12 +1,23 @@
 #csv_analyzer.py
 import pandas as pd
+import numpy as np
 from datetime import datetime
 
+# Rust-based calamine reader is much faster than openpyxl; fall back when it isn't installed
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+
 MONTHS = [
     "Jan", "Feb", "Mar", "Apr", "May", "Jun",
     "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"
 ]
 
+MONTH_TO_IDX = {month: idx for idx, month in enumerate(MONTHS)}
+MONTH_COLUMNS = [f"{month} {kind}" for month in MONTHS for kind in ("Planned", "Actual", "Billing")]
+
 FULL_MONTHS = [
     "January", "February", "March", "April", "May", "June",
     "July", "August", "September", "October", "November", "December"
@@ -31,26 +42,87 @@ DEPUTATION_HOURS = {
 }
 
 DEFAULT_WORKING_DAYS = 21
+
+# Parameters for an employee without any leave/exit adjustment
+DEFAULT_EMPLOYEE_PARAMS = {
+    "employee_left": False,
+    "left_in_month": "",
+    "left_day": 0,
+    "left_year": "",
+    "leave_month": "",
+    "leave_days": 0,
+    "replacement_info": {}
+}
 REQUIRED_COLUMNS_VARIANTS = [
     ["Resource", "Deputation", "Average/Flat-lined Rate"],
     ["NAME", "DEPUTATION", "Rate"],
     ["Name", "Deputation", "Rate"]
 ]
 
+# Input columns copied to the analysis output, followed by the TSR column when present
+OUTPUT_COLUMNS = [
+    "Hexaware ID's", "PPM ID", "Resource", "Project",
+    "Start Date", "End date", "Empl Status", "Average/Flat-lined Rate", "Deputation"
+]
+TSR_COLUMN_VARIANTS = ["TSR", "TSR Code", "TSR code", "tsr"]
+
+# Every (normalized) input column analyze_csv_bulk reads; other columns can be skipped when parsing
+BILLING_INPUT_COLUMNS = set(OUTPUT_COLUMNS + TSR_COLUMN_VARIANTS + [f"{m} Actual" for m in MONTHS])
+
+# Lowercased column name variations mapped to standard names
+COLUMN_NAME_MAPPING = {
+    "name": "Resource", "resource": "Resource",
+    "new_emp_id": "Hexaware ID's", "hexaware id's": "Hexaware ID's", "employee id": "Hexaware ID's",
+    "rate": "Average/Flat-lined Rate", "average rate": "Average/Flat-lined Rate",
+    "deputation": "Deputation",
+    "proj desc": "Project", "project": "Project",
+    "status": "Empl Status", "employee status": "Empl Status",
+    # All TSR code variants become a single "TSR" column
+    "tsr code": "TSR", "tsr": "TSR"
+}
+
+
+def round_values(values, decimals=2):
+    """
+    Vectorized round() for float arrays.
+
+    np.round scales by 10**decimals and rounds half to even, which differs from
+    Python's round() by one unit in the last place when the scaled value lands
+    exactly on .5. Those few elements are rounded with round() instead so the
+    amounts match the values produced by Python rounding.
+    """
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, decimals)
+    scaled = values * 10 ** decimals
+    ties = (scaled - np.floor(scaled)) == 0.5
+    if ties.any():
+        rounded[ties] = [round(value, decimals) for value in values[ties].tolist()]
+    return rounded
+
+
+def _parse_float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def to_float_values(values):
+    """
+    Vectorized float() for a column, with NaN where a value isn't a number.
+
+    Columns that mix text and numbers stay as text, and pd.to_numeric can parse
+    long decimals such as "108.24000000000001" to the neighbouring double. Text
+    columns are parsed with float() instead, which is exact.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    return values.map(_parse_float).astype(float)
+
 
 def normalize_column_names(df):
-    """Map common column name variations to standard names"""
-    column_mapping = {
-        "NAME": "Resource", "Name": "Resource", "name": "Resource", "RESOURCE": "Resource",
-        "NEW_EMP_ID": "Hexaware ID's", "Hexaware ID's": "Hexaware ID's", "Employee ID": "Hexaware ID's",
-        "Rate": "Average/Flat-lined Rate", "RATE": "Average/Flat-lined Rate", "Average Rate": "Average/Flat-lined Rate",
-        "DEPUTATION": "Deputation", "deputation": "Deputation",
-        "Proj Desc": "Project", "PROJECT": "Project", "project": "Project",
-        "STATUS": "Empl Status", "Status": "Empl Status", "Employee Status": "Empl Status",
-        # Keep TSR column as is - don't rename it
-        "TSR code": "TSR", "tsr": "TSR", "TSR Code": "TSR"
-    }
-    return df.rename(columns=column_mapping)
+    """Map common column name variations to standard names (case-insensitive)"""
+    return df.rename(columns=lambda col: COLUMN_NAME_MAPPING.get(str(col).lower(), col))
 
 
 def validate_csv_columns(df, csv_name="Main CSV"):
@@ -67,254 +139,214 @@ def validate_csv_columns(df, csv_name="Main CSV"):
         raise ValueError(f"{csv_name} is missing 'Average/Flat-lined Rate' or 'Rate' column")
 
 
-def analyze_csv_bulk(main_csv, employee_params, working_days_config, aug_csv=None):
-    import io
+def is_billing_column(col):
+    """True for input columns that analyze_csv_bulk reads, matched after name normalization"""
+    name = str(col).strip()
+    return COLUMN_NAME_MAPPING.get(name.lower(), name) in BILLING_INPUT_COLUMNS
 
-    main_csv.seek(0)
-    if main_csv.name.endswith(".xlsx"):
-        df = pd.read_excel(main_csv)
+
+def load_input_file(uploaded_file, nrows=None, usecols=None):
+    """Read an uploaded CSV/Excel file into a DataFrame with stripped column names (nrows=0 reads the header only)"""
+    uploaded_file.seek(0)
+    if uploaded_file.name.endswith(".xlsx"):
+        df = pd.read_excel(uploaded_file, nrows=nrows, usecols=usecols, engine=EXCEL_ENGINE)
     else:
-        df = pd.read_csv(io.StringIO(main_csv.getvalue().decode("utf-8")))
+        # pandas decodes the bytes in its C parser, no intermediate str copy
+        df = pd.read_csv(uploaded_file, encoding="utf-8", nrows=nrows, usecols=usecols)
 
     df.columns = df.columns.str.strip()
-    df = normalize_column_names(df)
+    return df
+
+
+def _as_dataframe(csv_or_df):
+    """Accept either an already parsed DataFrame or an uploaded file"""
+    if isinstance(csv_or_df, pd.DataFrame):
+        df = csv_or_df.copy()
+        df.columns = df.columns.str.strip()
+        return df
+    return load_input_file(csv_or_df, usecols=is_billing_column)
+
+
+def _format_date(year, month, day):
+    """
+    Format a year, month abbreviation and day as YYYY-MM-DD (None if they can't be formatted)
+    """
+    try:
+        return f"{year}-{MONTH_TO_IDX[month] + 1:02d}-{day:02d}"
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _billing_frame(meta, planned, actual, billing, deput_factor, avg_rate, updated):
+    """
+    Build output rows from the metadata columns and (rows, months) planned/actual/billing matrices
+    """
+    # Accumulate month by month (cumsum adds left to right) - sum() adds pairwise, and the last-bit
+    # differences that leaves can flip the rounded Billing Amount by a cent
+    total_planned = np.cumsum(planned, axis=1)[:, -1]
+    total_actual = np.cumsum(actual, axis=1)[:, -1]
+
+    # One wide block with the Planned/Actual/Billing columns interleaved per month
+    wide = np.empty((len(meta), 3 * len(MONTHS)))
+    wide[:, 0::3] = planned
+    wide[:, 1::3] = actual
+    wide[:, 2::3] = billing
+    month_df = pd.DataFrame(wide, columns=MONTH_COLUMNS)
+
+    totals = pd.DataFrame({
+        "Total Planned Hrs": total_planned,
+        "Total Actual Hrs": total_actual,
+        "Total Planned Vs Actual Diff": round_values(total_planned - total_actual, 2),
+        "Utilization %": round_values(
+            np.divide(total_actual, total_planned, out=np.zeros(len(meta)), where=total_planned != 0) * 100, 2),
+        "Billing Amount": round_values(total_actual * deput_factor * avg_rate, 2),
+        "Updated From CSV2": updated
+    })
+    return pd.concat([meta.infer_objects(), month_df, totals], axis=1)
+
+
+def analyze_csv_bulk(main_csv, employee_params, working_days_config=None, aug_csv=None):
+    # main_csv/aug_csv may be uploaded files or DataFrames that were already parsed by the caller
+    if working_days_config is None:
+        working_days_config = {m: DEFAULT_WORKING_DAYS for m in MONTHS}
+    df = normalize_column_names(_as_dataframe(main_csv))
     validate_csv_columns(df)
 
-    # Read optional updated CSV with actual values
-    aug_df = None
-    aug_dict = {}
-    if aug_csv is not None:
-        aug_csv.seek(0)
-        if aug_csv.name.endswith(".xlsx"):
-            aug_df = pd.read_excel(aug_csv)
-        else:
-            aug_df = pd.read_csv(io.StringIO(aug_csv.getvalue().decode("utf-8")))
-        aug_df.columns = aug_df.columns.str.strip()
-        aug_df = normalize_column_names(aug_df)
-
-        # Create a dictionary for quick lookup: {resource: {month: actual_hours}}
-        if "Resource" in aug_df.columns:
-            for _, aug_row in aug_df.iterrows():
-                resource_name = aug_row["Resource"]
-                aug_dict[resource_name] = {}
-                for month in MONTHS:
-                    actual_col = f"{month} Actual"
-                    if actual_col in aug_row and not pd.isna(aug_row[actual_col]):
-                        try:
-                            aug_dict[resource_name][month] = float(aug_row[actual_col])
-                        except (ValueError, TypeError):
-                            pass
-
-    output_columns = [
-        "Hexaware ID's", "PPM ID", "Resource", "Project",
-        "Start Date", "End date", "Empl Status", "Average/Flat-lined Rate", "Deputation"
-    ]
+    output_columns = list(OUTPUT_COLUMNS)
 
     # Check if TSR column exists in input and add it to output
-    tsr_column_name = None
-    for possible_tsr_col in ["TSR", "TSR Code", "TSR code", "tsr"]:
+    for possible_tsr_col in TSR_COLUMN_VARIANTS:
         if possible_tsr_col in df.columns:
-            tsr_column_name = possible_tsr_col
             output_columns.append(possible_tsr_col)
             break
 
-    final_data = []
-
-    for _, row in df.iterrows():
-        resource = row["Resource"]
-        deputation = str(row.get("Deputation", "")).upper()
-        deput_factor = DEPUTATION_FACTORS.get(deputation, 1)
-        deput_hours = DEPUTATION_HOURS.get(deputation, 8)
-
-        record = {col: row.get(col, "") for col in output_columns}
-        record["Updated From CSV2"] = "No"
-
-        # Preserve TSR column if it exists
-        if tsr_column_name and tsr_column_name in row:
-            record[tsr_column_name] = row[tsr_column_name]
-
-        params = employee_params.get(resource, {
-            "employee_left": False,
-            "left_in_month": "",
-            "left_day": 0,
-            "left_year": "",
-            "leave_month": "",
-            "leave_days": 0,
-            "replacement_info": {}
-        })
-
-        if params["employee_left"]:
-            record["Empl Status"] = "Inactive"
-            try:
-                month_num = MONTHS.index(params["left_in_month"]) + 1
-                end_date_str = f"{params['left_year']}-{month_num:02d}-{params['left_day']:02d}"
-                record["End date"] = end_date_str
-            except:
-                pass
-
-        total_planned_hours = 0
-        total_actual_hours = 0
-
-        # Get rate for billing calculation
-        try:
-            avg_rate = float(record.get("Average/Flat-lined Rate", 0) or 0)
-        except (ValueError, TypeError):
-            avg_rate = 0
-
-        for month in MONTHS:
-            planned_col = f"{month} Planned"
-            actual_col = f"{month} Actual"
-            billing_col = f"{month} Billing"
-            working_days = working_days_config.get(month, DEFAULT_WORKING_DAYS)
-            standard_hours = working_days * deput_hours
-
-            # PLANNED is always calculated using formula
-            planned = standard_hours
-
-            # ACTUAL: Try to get from CSV first, then calculate
-            actual = None
-            actual_from_csv = False
-
-            # First, check additional CSV (aug_csv)
-            if resource in aug_dict and month in aug_dict[resource]:
-                actual = aug_dict[resource][month]
-                actual_from_csv = True
-                record["Updated From CSV2"] = "Yes"
-            # Then check main CSV
-            elif actual_col in row and not pd.isna(row[actual_col]):
-                try:
-                    actual = float(row[actual_col])
-                    actual_from_csv = True
-                except (ValueError, TypeError):
-                    pass
-
-            # If no actual value provided in CSV, calculate it
-            if actual is None:
-                actual = standard_hours
-
-            # Apply employee adjustments ONLY if actual was not provided in CSV
-            if not actual_from_csv:
-                # If employee left
-                if params["employee_left"]:
-                    if month == params["left_in_month"]:
-                        # Work partial month until leaving day
-                        days_worked = params["left_day"]
-                        actual = round((days_worked / working_days) * standard_hours, 2)
-                    elif MONTHS.index(month) > MONTHS.index(params["left_in_month"]):
-                        # After leaving month: actual = 0
-                        actual = 0
-                # If on leave
-                elif params["leave_month"] and month == params["leave_month"]:
-                    actual = round(standard_hours * ((working_days - params["leave_days"]) / working_days), 2)
-
-            # Adjust PLANNED based on employee status
-            if params["employee_left"]:
-                if month == params["left_in_month"]:
-                    # Planned remains full for the leaving month
-                    planned = standard_hours
-                elif MONTHS.index(month) > MONTHS.index(params["left_in_month"]):
-                    # After leaving month: planned = 0
-                    planned = 0
-
-            # Calculate monthly billing
-            monthly_billing = round(actual * deput_factor * avg_rate, 2)
-
-            record[planned_col] = planned
-            record[actual_col] = actual
-            record[billing_col] = monthly_billing
-            total_planned_hours += planned
-            total_actual_hours += actual
-
-        record["Total Planned Hrs"] = total_planned_hours
-        record["Total Actual Hrs"] = total_actual_hours
-        record["Total Planned Vs Actual Diff"] = round(total_planned_hours - total_actual_hours, 2)
-        record["Utilization %"] = round((total_actual_hours / total_planned_hours) * 100,
-                                        2) if total_planned_hours else 0
-        record["Billing Amount"] = round(total_actual_hours * deput_factor * avg_rate, 2)
-        final_data.append(record)
-
-        # Replacement employee logic
-        rep_info = params.get("replacement_info", {})
-        if rep_info.get("replacement"):
-            new_record = record.copy()
-            new_record["Resource"] = rep_info["replacement_name"]
-            new_record["Hexaware ID's"] = rep_info["replacement_id"]
-            new_record["Empl Status"] = "Active"
-            new_record["Updated From CSV2"] = "No"
-
-            try:
-                join_month_num = MONTHS.index(rep_info["join_month"]) + 1
-                join_date_str = f"{rep_info['join_year']}-{join_month_num:02d}-{rep_info['join_day']:02d}"
-                new_record["Start Date"] = join_date_str
-            except:
-                pass
-
-            # Keep original End date from the project
-            new_record["End date"] = row.get("End date", "")
-
-            total_planned_hours_new = 0
-            total_actual_hours_new = 0
-
-            # Get rate for billing calculation
-            try:
-                avg_rate_new = float(new_record.get("Average/Flat-lined Rate", 0) or 0)
-            except (ValueError, TypeError):
-                avg_rate_new = 0
-
-            for month in MONTHS:
-                planned_col = f"{month} Planned"
-                actual_col = f"{month} Actual"
-                billing_col = f"{month} Billing"
-                working_days = working_days_config.get(month, DEFAULT_WORKING_DAYS)
-                standard_hours = working_days * deput_hours
-
-                # PLANNED: Always calculated
-                # Before join month: 0
-                if MONTHS.index(month) < MONTHS.index(rep_info["join_month"]):
-                    planned = 0
-                    actual = 0
-                    monthly_billing = 0
-                elif month == rep_info["join_month"]:
-                    # Full planned for join month
-                    planned = standard_hours
-                    # Actual: partial based on join day
-                    days_worked = working_days - (rep_info["join_day"] - 1)
-                    actual = round((days_worked / working_days) * standard_hours, 2)
-                    monthly_billing = round(actual * deput_factor * avg_rate_new, 2)
-                else:
-                    # After join month: full hours
-                    planned = standard_hours
-                    actual = standard_hours
-                    monthly_billing = round(actual * deput_factor * avg_rate_new, 2)
-
-                new_record[planned_col] = planned
-                new_record[actual_col] = actual
-                new_record[billing_col] = monthly_billing
-
-                total_planned_hours_new += planned
-                total_actual_hours_new += actual
-
-            new_record["Total Planned Hrs"] = total_planned_hours_new
-            new_record["Total Actual Hrs"] = total_actual_hours_new
-            new_record["Total Planned Vs Actual Diff"] = round(total_planned_hours_new - total_actual_hours_new, 2)
-            new_record["Utilization %"] = round((total_actual_hours_new / total_planned_hours_new) * 100,
-                                                2) if total_planned_hours_new > 0 else 0
-            new_record["Billing Amount"] = round(total_actual_hours_new * deput_factor * avg_rate_new, 2)
-
-            final_data.append(new_record)
-
-    # Columns order
-    month_cols = []
-    for m in MONTHS:
-        month_cols.append(f"{m} Planned")
-        month_cols.append(f"{m} Actual")
-        month_cols.append(f"{m} Billing")
-
-    final_df = pd.DataFrame(final_data)
-    final_df = final_df[output_columns + month_cols + [
-        "Total Planned Hrs", "Total Actual Hrs",
-        "Total Planned Vs Actual Diff", "Utilization %",
-        "Billing Amount", "Updated From CSV2"
-    ]]
-
-    return final_df
\ No newline at end of file
+    n_rows = len(df)
+    df = df.reset_index(drop=True)
+    resources = df["Resource"].to_numpy()
+
+    # Per-row deputation factor/hours and billing rate (missing or invalid rates bill at 0)
+    # Deputation only has a handful of distinct values, so look them up per category and gather by code.
+    # Missing values are filled with "NAN" first so they get a category (and the defaults) of their own.
+    deputation = df["Deputation"].fillna("NAN").astype(str).astype("category").cat
+    deput_types = deputation.categories.str.upper()
+    deput_codes = deputation.codes.to_numpy()
+    deput_factor = deput_types.map(DEPUTATION_FACTORS).fillna(1).to_numpy(dtype=float)[deput_codes]
+    deput_hours = deput_types.map(DEPUTATION_HOURS).fillna(8).to_numpy(dtype=float)[deput_codes]
+    avg_rate = to_float_values(df["Average/Flat-lined Rate"]).fillna(0).to_numpy(dtype=float)
+
+    # (rows, months) matrix of standard hours
+    working_days = np.array([working_days_config.get(m, DEFAULT_WORKING_DAYS) for m in MONTHS], dtype=float)
+    standard_hours = deput_hours[:, None] * working_days[None, :]
+
+    # ACTUAL: additional CSV first, then main CSV, otherwise the calculated standard hours
+    actual_cols = [f"{m} Actual" for m in MONTHS]
+    main_actual = df.reindex(columns=actual_cols).apply(to_float_values).to_numpy(dtype=float)
+
+    # Read optional updated CSV with actual values, aligned to the main rows by resource
+    aug_actual = np.full((n_rows, len(MONTHS)), np.nan)
+    if aug_csv is not None:
+        aug_df = normalize_column_names(_as_dataframe(aug_csv))
+        if "Resource" in aug_df.columns:
+            # The last row wins for resources listed more than once
+            aug_lookup = aug_df.drop_duplicates("Resource", keep="last").set_index("Resource")
+            aug_actual = (
+                aug_lookup.reindex(index=resources, columns=actual_cols)
+                .apply(to_float_values)
+                .to_numpy(dtype=float)
+            )
+
+    aug_mask = ~np.isnan(aug_actual)
+    actual_from_csv = aug_mask | ~np.isnan(main_actual)
+    actual = np.where(aug_mask, aug_actual, np.where(np.isnan(main_actual), standard_hours, main_actual))
+
+    # PLANNED is always calculated using formula
+    planned = standard_hours.copy()
+
+    # Status and date strings are written below, so those columns are object-typed first -
+    # blank columns are read as float and Excel date columns as datetime
+    meta = df.reindex(columns=output_columns, fill_value="")
+    meta = meta.astype({col: object for col in ("Start Date", "End date", "Empl Status")})
+    original_end_dates = meta["End date"].copy()
+
+    # Employee adjustment parameters as per-row arrays (month indexes are -1 when not set)
+    row_params = [employee_params.get(resource, DEFAULT_EMPLOYEE_PARAMS) for resource in resources]
+    employee_left = np.array([bool(params["employee_left"]) for params in row_params], dtype=bool)
+    left_idx = np.array([MONTH_TO_IDX.get(params["left_in_month"], -1) for params in row_params], dtype=int)
+    left_day = np.array([params["left_day"] for params in row_params], dtype=float)
+    leave_idx = np.array([MONTH_TO_IDX.get(params["leave_month"], -1) for params in row_params], dtype=int)
+    leave_days = np.array([params["leave_days"] for params in row_params], dtype=float)
+
+    # Employees who left become inactive, with the leaving date as their End date
+    meta.loc[employee_left, "Empl Status"] = "Inactive"
+    left_rows = np.flatnonzero(employee_left)
+    end_dates = pd.Series([
+        _format_date(row_params[i]["left_year"], row_params[i]["left_in_month"], row_params[i]["left_day"])
+        for i in left_rows
+    ], index=left_rows, dtype=object).dropna()
+    meta.loc[end_dates.index, "End date"] = end_dates
+
+    # (rows, months) masks for the leaving month, months after leaving, and the leave month
+    month_idx = np.arange(len(MONTHS))[None, :]
+    is_left_month = employee_left[:, None] & (left_idx[:, None] == month_idx)
+    after_left = employee_left[:, None] & (left_idx[:, None] >= 0) & (month_idx > left_idx[:, None])
+    on_leave = ~employee_left[:, None] & (leave_idx[:, None] == month_idx)
+
+    # Apply employee adjustments to ACTUAL only where it was not provided in CSV
+    calculated = ~actual_from_csv
+    # Work partial month until leaving day
+    mask = calculated & is_left_month
+    actual[mask] = round_values(((left_day[:, None] / working_days[None, :]) * standard_hours)[mask], 2)
+    # After leaving month: actual = 0
+    actual[calculated & after_left] = 0
+    # Leave days reduce the leave month
+    mask = calculated & on_leave
+    actual[mask] = round_values(
+        (standard_hours * ((working_days[None, :] - leave_days[:, None]) / working_days[None, :]))[mask], 2)
+
+    # After leaving month: planned = 0 (planned remains full for the leaving month)
+    planned[after_left] = 0
+
+    billing = round_values(actual * deput_factor[:, None] * avg_rate[:, None], 2)
+
+    main_df = _billing_frame(meta, planned, actual, billing, deput_factor, avg_rate,
+                             np.where(aug_mask.any(axis=1), "Yes", "No"))
+
+    # Replacement employee logic
+    rep_infos = [params.get("replacement_info", {}) for params in row_params]
+    replacement_positions = np.flatnonzero([bool(info.get("replacement")) for info in rep_infos])
+    if not len(replacement_positions):
+        return main_df
+    rep_infos = [rep_infos[i] for i in replacement_positions]
+
+    rep_meta = meta.take(replacement_positions).reset_index(drop=True)
+    rep_meta["Resource"] = [info["replacement_name"] for info in rep_infos]
+    rep_meta["Hexaware ID's"] = [info["replacement_id"] for info in rep_infos]
+    rep_meta["Empl Status"] = "Active"
+    # Keep original End date from the project
+    rep_meta["End date"] = original_end_dates.to_numpy()[replacement_positions]
+    start_dates = pd.Series(
+        [_format_date(info["join_year"], info["join_month"], info["join_day"]) for info in rep_infos],
+        dtype=object).dropna()
+    rep_meta.loc[start_dates.index, "Start Date"] = start_dates
+
+    join_idx = np.array([MONTH_TO_IDX[info["join_month"]] for info in rep_infos], dtype=int)
+    join_day = np.array([info["join_day"] for info in rep_infos], dtype=float)
+    rep_factor = deput_factor[replacement_positions]
+    rep_rate = avg_rate[replacement_positions]
+
+    # Nothing before the join month, partial actual in the join month, full hours afterwards
+    joined = month_idx >= join_idx[:, None]
+    rep_planned = np.where(joined, standard_hours[replacement_positions], 0.0)
+    rep_actual = rep_planned.copy()
+    mask = month_idx == join_idx[:, None]
+    days_worked = working_days[None, :] - (join_day[:, None] - 1)
+    rep_actual[mask] = round_values(((days_worked / working_days[None, :]) * rep_planned)[mask], 2)
+    rep_billing = np.where(joined, round_values(rep_actual * rep_factor[:, None] * rep_rate[:, None], 2), 0.0)
+
+    rep_df = _billing_frame(rep_meta, rep_planned, rep_actual, rep_billing, rep_factor, rep_rate,
+                            np.full(len(rep_infos), "No"))
+
+    # Place each replacement row right after the employee it replaces
+    final_df = pd.concat([main_df, rep_df], ignore_index=True)
+    order = np.argsort(np.concatenate([np.arange(n_rows), replacement_positions]), kind="stable")
+    return final_df.take(order).reset_index(drop=True)
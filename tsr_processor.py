@@ -1,6 +1,11 @@
 #tsr_processor.py
+import logging
+import numbers
 import pandas as pd
-import io
+import numpy as np
+from csv_analyzer import load_input_file, round_values, to_float_values
+
+log = logging.getLogger(__name__)
 
 # Country mapping for deputation types
 DEPUTATION_TO_COUNTRY = {
@@ -16,6 +21,9 @@ DEFAULT_EXCHANGE_RATES = {
     "USD": 1.0  # 1 USD = 1 USD
 }
 
+# Main data columns that may hold an employee's TSR code, in lookup order
+TSR_CODE_COLUMNS = ["TSR", "TSR Code", "TSR code", "tsr", "PPM ID"]
+
 # Currency mapping by country
 COUNTRY_TO_CURRENCY = {
     "India": "INR",
@@ -33,13 +41,7 @@ def load_tsr_file(tsr_file):
     """
     Load TSR file (CSV or Excel) and return DataFrame
     """
-    tsr_file.seek(0)
-    if tsr_file.name.endswith('.xlsx'):
-        tsr_df = pd.read_excel(tsr_file)
-    else:
-        tsr_df = pd.read_csv(io.StringIO(tsr_file.getvalue().decode("utf-8")))
-
-    tsr_df.columns = tsr_df.columns.str.strip()
+    tsr_df = load_input_file(tsr_file)
 
     # Validate required columns
     required_cols = ["TSR Code", "TSR Name"]
@@ -55,14 +57,10 @@ def normalize_tsr_columns(tsr_df):
     Normalize TSR column names
     """
     column_mapping = {
-        "TSR code": "TSR Code",
-        "Tsr Code": "TSR Code",
         "tsr code": "TSR Code",
-        "TSR name": "TSR Name",
-        "Tsr Name": "TSR Name",
         "tsr name": "TSR Name"
     }
-    return tsr_df.rename(columns=column_mapping)
+    return tsr_df.rename(columns=lambda col: column_mapping.get(str(col).lower(), col))
 
 
 def convert_exchange_rate(rate_value, conversion_method):
@@ -85,68 +83,76 @@ def convert_exchange_rate(rate_value, conversion_method):
         return rate_value
 
 
-def get_tsr_amount_for_employee(tsr_df, tsr_code, deputation, offshore_country, exchange_rates):
+def _deputation_currency(deputation, offshore_country):
     """
-    Get TSR amount in USD for an employee based on deputation type
-
-    Args:
-        tsr_df: TSR DataFrame
-        tsr_code: Employee's TSR code
-        deputation: Employee's deputation type (OFFSHORE/ONSITE/NEARSHORE)
-        offshore_country: Selected offshore country
-        exchange_rates: Dictionary of exchange rates (multiply method)
-
-    Returns:
-        tuple: (tsr_amount_usd, tsr_name, currency_used)
+    Currency of the country an employee works from, given the upper-cased deputation type
     """
-    if pd.isna(tsr_code) or tsr_code == "":
-        return 0, "", ""
-
-    # Extract numeric part from TSR code (e.g., "102 B" -> 102)
-    tsr_code_str = str(tsr_code).strip()
-    tsr_numeric = tsr_code_str.split()[0] if ' ' in tsr_code_str else tsr_code_str
-
-    # Try to convert to int for matching
-    try:
-        tsr_numeric = int(tsr_numeric)
-    except (ValueError, TypeError):
-        return 0, "", ""
-
-    # Find TSR record - try both numeric and string matching
-    tsr_record = tsr_df[tsr_df["TSR Code"] == tsr_numeric]
-    if tsr_record.empty:
-        # Try string matching
-        tsr_record = tsr_df[tsr_df["TSR Code"].astype(str) == str(tsr_numeric)]
-    if tsr_record.empty:
-        return 0, "", ""
-
-    tsr_record = tsr_record.iloc[0]
-    tsr_name = tsr_record.get("TSR Name", "")
-
     # Determine country based on deputation
-    deputation = str(deputation).upper()
     if deputation == "OFFSHORE":
         country = offshore_country
     else:
         country = DEPUTATION_TO_COUNTRY.get(deputation, "USA")
 
     # Get currency for the country
-    currency = COUNTRY_TO_CURRENCY.get(country, "USD")
+    return COUNTRY_TO_CURRENCY.get(country, "USD")
 
-    # Get TSR amount in local currency
-    if currency not in tsr_record or pd.isna(tsr_record[currency]):
-        return 0, tsr_name, currency
 
-    try:
-        tsr_local = float(tsr_record[currency])
-    except (ValueError, TypeError):
-        return 0, tsr_name, currency
+def _first_tsr_codes(main_df):
+    """
+    First non-empty TSR code of each row, checking the possible TSR columns in order ("" when none)
+    """
+    tsr_codes = np.full(len(main_df), "", dtype=object)
+    found = np.zeros(len(main_df), dtype=bool)
+    for col in TSR_CODE_COLUMNS:
+        if col not in main_df.columns:
+            continue
+        values = main_df[col]
+        usable = (values.notna() & (values != "")).to_numpy(dtype=bool) & ~found
+        tsr_codes[usable] = values.to_numpy(dtype=object)[usable]
+        found |= usable
+    return tsr_codes
+
+
+def _parse_tsr_codes(tsr_codes):
+    """
+    Numeric part of each TSR code (e.g. "102 B" -> 102), <NA> when it is not an integer
+    """
+    codes = pd.Series(tsr_codes, dtype=object)
+    text = codes.where(codes.notna() & (codes != "")).astype("string").str.strip()
+    has_space = text.str.contains(" ", regex=False).fillna(False).astype(bool)
+    text = text.where(~has_space, text.str.split(n=1).str[0])
+    # Same integer forms int() accepts, including "_" digit separators
+    is_int = text.str.fullmatch(r"[+-]?\d+(?:_\d+)*").fillna(False).astype(bool)
+    return pd.to_numeric(text.where(is_int).str.replace("_", ""), errors="coerce").astype("Int64")
 
-    # Convert to USD
-    exchange_rate = exchange_rates.get(currency, 1.0)
-    tsr_usd = tsr_local * exchange_rate
 
-    return round(tsr_usd, 2), tsr_name, currency
+def _match_tsr_rows(tsr_df, tsr_numbers):
+    """
+    Position of the first TSR row matching each parsed code (-1 when none).
+    Numeric TSR codes are matched first, then the text form of the code.
+    """
+    tsr_codes = tsr_df["TSR Code"]
+    positions = np.arange(len(tsr_df))
+
+    if pd.api.types.is_numeric_dtype(tsr_codes):
+        numeric_codes = tsr_codes.to_numpy(dtype=float)
+    elif tsr_codes.dtype == object:
+        numeric_codes = tsr_codes.map(lambda v: v if isinstance(v, numbers.Number) else np.nan).to_numpy(dtype=float)
+    else:
+        numeric_codes = np.full(len(tsr_df), np.nan)
+    by_number = pd.Series(positions, index=numeric_codes)
+    by_number = by_number[by_number.index.notna() & ~by_number.index.duplicated()]
+
+    text_codes = tsr_codes.astype(str)
+    by_text = pd.Series(positions, index=text_codes.to_numpy())
+    by_text = by_text[text_codes.notna().to_numpy() & ~by_text.index.duplicated()]
+
+    numbers_found = tsr_numbers.notna().to_numpy()
+    matched = np.full(len(tsr_numbers), np.nan)
+    matched[numbers_found] = by_number.reindex(tsr_numbers[numbers_found].to_numpy(dtype=float)).to_numpy()
+    by_text_match = by_text.reindex(tsr_numbers[numbers_found].astype(str).to_numpy()).to_numpy()
+    matched[numbers_found] = np.where(np.isnan(matched[numbers_found]), by_text_match, matched[numbers_found])
+    return np.nan_to_num(matched, nan=-1).astype(int)
 
 
 def add_tsr_to_dataframe(main_df, tsr_df, offshore_country, exchange_rates, months):
@@ -163,123 +169,89 @@ def add_tsr_to_dataframe(main_df, tsr_df, offshore_country, exchange_rates, mont
     Returns:
         Enhanced DataFrame with TSR columns
     """
-    enhanced_df = main_df.copy()
-
     # Normalize TSR columns
-    tsr_df = normalize_tsr_columns(tsr_df)
-
-    # Debug: Print TSR file info
-    print(f"TSR DataFrame columns: {tsr_df.columns.tolist()}")
-    print(f"TSR DataFrame shape: {tsr_df.shape}")
-    print(f"TSR Codes in file: {tsr_df['TSR Code'].tolist()}")
-
-    # Debug: Print main file columns
-    print(f"Main DataFrame columns: {enhanced_df.columns.tolist()}")
-
-    # Add TSR Code and TSR Name columns at the beginning (after basic info)
-    tsr_code_col = []
-    tsr_name_col = []
-
-    # Store monthly TSR values
-    monthly_tsr_data = {}
-
-    # Process each row
-    for idx, row in enhanced_df.iterrows():
-        # Try to get TSR Code from main data
-        tsr_code = ""
-
-        # Check multiple possible column names for TSR
-        for col in ["TSR", "TSR Code", "TSR code", "tsr", "PPM ID"]:
-            if col in row and not pd.isna(row[col]) and row[col] != "":
-                tsr_code = row[col]
-                print(f"Row {idx}: Found TSR code '{tsr_code}' in column '{col}'")
-                break
-
-        if not tsr_code:
-            print(f"Row {idx}: No TSR code found")
-
-        deputation = row.get("Deputation", "")
-        print(f"Row {idx}: Deputation = '{deputation}'")
-
-        # Get TSR amount for this employee
-        tsr_amount_usd, tsr_name, currency = get_tsr_amount_for_employee(
-            tsr_df, tsr_code, deputation, offshore_country, exchange_rates
-        )
-
-        print(f"Row {idx}: TSR Amount = {tsr_amount_usd}, TSR Name = '{tsr_name}', Currency = '{currency}'")
+    tsr_df = normalize_tsr_columns(tsr_df).reset_index(drop=True)
+
+    # Convert the currency amounts once instead of per employee
+    currency_cols = get_available_currencies(tsr_df)
+    tsr_df[currency_cols] = tsr_df[currency_cols].apply(to_float_values)
+
+    # Debug: Log TSR file info and main file columns (only built when debug logging is on)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("TSR DataFrame columns: %s", tsr_df.columns.tolist())
+        log.debug("TSR DataFrame shape: %s", tsr_df.shape)
+        log.debug("TSR Codes in file: %s", tsr_df["TSR Code"].tolist())
+        log.debug("Main DataFrame columns: %s", main_df.columns.tolist())
+
+    # TSR codes are parsed and matched to TSR rows for all employees at once,
+    # then the matched rows are left-joined onto the employees (no match gives an empty row)
+    tsr_code_col = _first_tsr_codes(main_df).tolist()
+    tsr_rows = _match_tsr_rows(tsr_df, _parse_tsr_codes(tsr_code_col))
+    matched = tsr_df.reindex(tsr_rows)
+    has_match = tsr_rows >= 0
+
+    if "TSR Name" in matched.columns:
+        tsr_name_col = matched["TSR Name"].where(has_match, "").tolist()
+    else:
+        tsr_name_col = [""] * len(main_df)
 
-        tsr_code_col.append(tsr_code)
-        tsr_name_col.append(tsr_name)
+    # Currency and exchange rate per deputation type, gathered to rows by category code.
+    # Missing deputations are filled with "NAN" first so they get a category (and the default currency) of their own.
+    if "Deputation" in main_df.columns:
+        deputation = main_df["Deputation"].fillna("NAN").astype(str).astype("category").cat
+    else:
+        deputation = pd.Series("", index=main_df.index).astype("category").cat
+    dep_currencies = [_deputation_currency(dep, offshore_country) for dep in deputation.categories.str.upper()]
+    dep_rates = np.array([exchange_rates.get(currency, 1.0) for currency in dep_currencies], dtype=float)
+    dep_codes = deputation.codes.to_numpy()
+    row_rate = dep_rates[dep_codes]
+
+    # TSR amount in local currency from the matched row (missing or invalid amounts count as 0),
+    # one gather from the (rows, currencies) matrix with a trailing NaN column for currencies not in the file
+    currency_index = {currency: i for i, currency in enumerate(currency_cols)}
+    dep_currency_idx = np.array([currency_index.get(currency, -1) for currency in dep_currencies], dtype=int)
+    local_values = np.column_stack([matched[currency_cols].to_numpy(dtype=float), np.full(len(main_df), np.nan)])
+    tsr_local = local_values[np.arange(len(main_df)), dep_currency_idx[dep_codes]]
 
-        # Store monthly TSR (same amount for each month)
-        if idx not in monthly_tsr_data:
-            monthly_tsr_data[idx] = {}
+    # Convert to USD
+    has_amount = has_match & ~np.isnan(tsr_local)
+    tsr_amount_col = np.where(has_amount, round_values(tsr_local * row_rate, 2), 0.0)
+    log.debug("TSR amounts found for %d of %d employees", has_amount.sum(), len(main_df))
 
-        for month in months:
-            monthly_tsr_data[idx][month] = tsr_amount_usd
+    # Monthly TSR is the same amount for each month
+    tsr_matrix = np.tile(np.asarray(tsr_amount_col, dtype=float).reshape(-1, 1), (1, len(months)))
+    tsr_columns = {"TSR Code": tsr_code_col, "TSR Name": tsr_name_col}
+    tsr_columns.update({f"{month} TSR": tsr_matrix[:, i] for i, month in enumerate(months)})
+    # Add the months up in order (cumsum goes left to right, sum() pairwise) so the total matches a running sum
+    tsr_columns["Total TSR"] = np.cumsum(tsr_matrix, axis=1)[:, -1] if len(months) else np.zeros(len(main_df))
 
-    # Rebuild dataframe with correct column order
-    # Get all column names from enhanced_df
-    all_columns = list(enhanced_df.columns)
+    # Calculate DGM columns
+    billing = main_df["Billing Amount"].to_numpy(dtype=float)
+    dgm = billing - tsr_columns["Total TSR"]
+    tsr_columns["DGM"] = dgm
+    tsr_columns["%DGM"] = round_values(np.divide(dgm, billing, out=np.zeros_like(dgm), where=billing != 0) * 100, 2)
 
     # Find where to insert TSR Code and TSR Name (after Deputation)
+    all_columns = list(main_df.columns)
     if "Deputation" in all_columns:
         insert_pos = all_columns.index("Deputation") + 1
     else:
         insert_pos = len([col for col in all_columns if not any(m in col for m in months)])
 
-    # Create new dataframe with reordered columns
-    new_df = pd.DataFrame()
-
-    # Add columns before TSR Code/Name
-    for col in all_columns[:insert_pos]:
-        new_df[col] = enhanced_df[col]
-
-    # Add TSR Code and TSR Name
-    new_df["TSR Code"] = tsr_code_col
-    new_df["TSR Name"] = tsr_name_col
-
-    # Add monthly columns in order: Planned, Actual, Billing, TSR
-    total_tsr_col = []
-    for idx in range(len(enhanced_df)):
-        total_tsr = 0
-        for month in months:
-            planned_col = f"{month} Planned"
-            actual_col = f"{month} Actual"
-            billing_col = f"{month} Billing"
-            tsr_col = f"{month} TSR"
-
-            if planned_col in enhanced_df.columns:
-                new_df.loc[idx, planned_col] = enhanced_df.loc[idx, planned_col]
-            if actual_col in enhanced_df.columns:
-                new_df.loc[idx, actual_col] = enhanced_df.loc[idx, actual_col]
-            if billing_col in enhanced_df.columns:
-                new_df.loc[idx, billing_col] = enhanced_df.loc[idx, billing_col]
-
-            # Add TSR after billing
-            tsr_value = monthly_tsr_data[idx][month]
-            new_df.loc[idx, tsr_col] = tsr_value
-            total_tsr += tsr_value
-
-        total_tsr_col.append(total_tsr)
-
-    # Add remaining columns (totals, etc.)
-    remaining_cols = [col for col in all_columns[insert_pos:] if not any(m in col for m in months)]
-    for col in remaining_cols:
-        new_df[col] = enhanced_df[col]
-
-    # Add Total TSR
-    new_df["Total TSR"] = total_tsr_col
-
-    # Calculate DGM columns
-    new_df["DGM"] = new_df["Billing Amount"] - new_df["Total TSR"]
-    new_df["%DGM"] = new_df.apply(
-        lambda row: round((row["DGM"] / row["Billing Amount"]) * 100, 2) if row["Billing Amount"] != 0 else 0,
-        axis=1
-    )
-
-    print(f"Final DataFrame shape: {new_df.shape}")
-    print(f"TSR columns added: {[col for col in new_df.columns if 'TSR' in col]}")
+    # Column order: columns before TSR Code/Name, TSR Code and TSR Name,
+    # monthly Planned, Actual, Billing, TSR, then the remaining columns (totals, etc.), Total TSR and DGM
+    ordered_cols = all_columns[:insert_pos] + ["TSR Code", "TSR Name"]
+    for month in months:
+        ordered_cols += [col for col in (f"{month} Planned", f"{month} Actual", f"{month} Billing")
+                         if col in main_df.columns]
+        ordered_cols.append(f"{month} TSR")
+    ordered_cols += [col for col in all_columns[insert_pos:] if not any(m in col for m in months)]
+    ordered_cols += ["Total TSR", "DGM", "%DGM"]
+    new_df = main_df.assign(**tsr_columns).reindex(columns=list(dict.fromkeys(ordered_cols)))
+
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Final DataFrame shape: %s", new_df.shape)
+        log.debug("TSR columns added: %s", [col for col in new_df.columns if "TSR" in col])
 
     return new_df
 